@@ -1,13 +1,16 @@
-module.exports = {
-  gpt3: {
+// Frozen so nothing can mutate shared settings at runtime
+module.exports = Object.freeze({
+  gpt3: Object.freeze({
     apiKey: process.env.OPENAI_API_KEY,
     temperature: 0.85,
     thirdPartyName: "People",
     maxMessages: 6,
     maxMemories: 5,
-  },
+    cacheMaxEntries: 500,
+    cacheTtlMs: 1000 * 60 * 60,
+  }),
   maxMessages: 6,
-  google: {
+  google: Object.freeze({
     projectId: "jsonresume-registry",
-  },
-};
+  }),
+});
@@ -11,10 +11,16 @@ const isEnglish = require("is-english");
 const config = require("./config");
 const { gpt3 } = require("./lib/gpt3");
 const { sleep } = require("./lib/sleep");
-const { findProfile, createMemory } = require("./lib/profile");
+const {
+  findProfile,
+  createMemory,
+  readMemories,
+  memoryVersion,
+} = require("./lib/profile");
 const wsrn = require("./lib/wsrn");
 
 const uidgen = new UIDGenerator();
+const writeFile = util.promisify(fs.writeFile);
 const newclient = new textToSpeech.TextToSpeechClient({
   projectId: config.google.projectId,
 });
@@ -37,36 +43,64 @@ setInterval(() => {
 // Load profile
 const { profile } = require("./profiles/omega");
 
-// Initialize sound client
-const client = new wsrn({
+// Sound client options never change, build them once
+const WSRN_OPTIONS = Object.freeze({
   // On linux e.g. chromePath: "/usr/bin/google-chrome-stable",
   chromePath: "C:/Program Files/Google/Chrome/Application/chrome.exe",
   continuous: true,
 });
 
+// One place that builds a sound client with its handlers wired up; used at
+// boot and again when the client is recreated after playback. With
+// deferRecording the client boots its browser but waits for beginRecording,
+// so it can be launched while a clip is still playing without hearing itself
+const createClient = ({ deferRecording } = {}) => {
+  const newClient = new wsrn(WSRN_OPTIONS);
+  newClient.isReady = false;
+  newClient.recordingWanted = !deferRecording;
+  newClient.on("ready", () => {
+    newClient.isReady = true;
+    if (!newClient.recordingWanted) {
+      return;
+    }
+    console.log("SPEECH_TO_TEXT: STARTED");
+    newClient.record();
+    start();
+  });
+  // RESTART PROGRAM?
+  newClient.on("error", (e) => {
+    console.log("Shutdown client and restart", e);
+    console.log("STOP CLIENT RECORDING");
+    console.log("TRY CLIENT RECORDING");
+    // A deferred client must not start recording mid-playback, even on error
+    if (newClient.recordingWanted && (!state.thinking || !state.speaking)) {
+      newClient.record();
+    }
+  });
+  return newClient;
+};
+
+// Ask a deferred client to begin recording, whether or not its browser has
+// finished booting yet
+const beginRecording = (deferredClient) => {
+  deferredClient.recordingWanted = true;
+  if (deferredClient.isReady) {
+    console.log("SPEECH_TO_TEXT: STARTED");
+    deferredClient.record();
+    start();
+  }
+};
+
 const state = {
   processing: true,
   speaking: false,
   thinking: false,
-  client,
+  client: null,
 };
 
 console.log("= APP STARTING =");
-state.client.on("ready", () => {
-  console.log("SPEECH_TO_TEXT: STARTED");
-  state.client.record();
-  start();
-});
-
-// RESTART PROGRAM?
-state.client.on("error", (e) => {
-  console.log("Shutdown client and restart", e);
-  console.log("STOP CLIENT RECORDING");
-  console.log("TRY CLIENT RECORDING");
-  if (!state.thinking || !state.speaking) {
-    state.client.record();
-  }
-});
+// Initialize sound client
+state.client = createClient();
 
 const validateTranscription = (text) => {
   console.log("=== Validate Transcription ===");
@@ -82,9 +116,50 @@ const validateTranscription = (text) => {
   return true;
 };
 
-const messageStack = JSON.parse(
-  fs.readFileSync(path.join(__dirname, "../messages.json"), "utf8")
-);
+const MESSAGES_PATH = path.join(__dirname, "../messages.json");
+
+const messageStack = JSON.parse(fs.readFileSync(MESSAGES_PATH, "utf8"));
+
+// Single persistence point for the message log; fire-and-forget so the
+// reply path never waits on disk. Compact JSON - the log is re-serialised
+// in full on every message, so pretty-printing just multiplies the bytes.
+// Writes are chained on one pending promise so rapid transcripts can't
+// interleave or land out of order and corrupt the log
+let pendingWrite = Promise.resolve();
+const persistMessages = () => {
+  const snapshot = JSON.stringify(messageStack);
+  pendingWrite = pendingWrite
+    .then(() => fs.promises.writeFile(MESSAGES_PATH, snapshot, "utf8"))
+    .catch((e) => console.log(e));
+};
+
+// The rendered prompt prefix only changes when a bot gains a memory, so
+// cache it per bot and only rebuild when the memory version moves
+const promptCache = {};
+
+const buildDefaultPrompt = (profile) => {
+  const botName = profile.name;
+  const version = memoryVersion(botName);
+  const cached = promptCache[botName];
+  if (cached && cached.version === version) {
+    return cached.prompt;
+  }
+
+  let memoryStack = readMemories(botName);
+  memoryStack = memoryStack.slice(
+    Math.max(memoryStack.length - config.gpt3.maxMemories, 0)
+  );
+  // TODO - Figure out a better style for  memory classification
+  const memoryContext = [
+    `${botName} likes to talk about: \n`,
+    ...memoryStack.map((m) => `- ${m}\n`),
+    `\n\n`,
+  ].join("\n");
+
+  const prompt = profile.prompt(NAME, botName, memoryContext);
+  promptCache[botName] = { version, prompt };
+  return prompt;
+};
 
 const start = async () => {
   if (state.speaking) {
@@ -106,52 +181,19 @@ const start = async () => {
     const profile = findProfile(transcript);
     const botName = profile.name;
 
-    try {
-      messageStack.push(`${NAME}: ${transcript}`.trim());
-      fs.writeFileSync(
-        "../messages.json",
-        JSON.stringify(messageStack, undefined, 4),
-        "utf8"
-      );
-    } catch (e) {
-      console.log(e);
-    }
+    messageStack.push(`${NAME}: ${transcript}`.trim());
+    // Persist off the critical path so the gpt3 call isn't blocked on disk
+    persistMessages();
 
     // Create and read memories (work in progress)
-    let memoryStack = [];
-    let memoriesStack = [];
-    try {
-      memoryStack = JSON.parse(
-        fs.readFileSync(
-          path.join(__dirname, `../memories/${botName.toLowerCase()}.json`),
-          "utf8"
-        )
-      );
-    } catch (memoryErr) {
-      console.log("====== NO MEMORIES YET FOR ======", botName, memoryErr);
-    }
-    memoryStack = memoryStack.slice(
-      Math.max(memoryStack.length - config.gpt3.maxMemories, 0)
-    );
-    // TODO - Figure out a better style for  memory classification
-    memoriesStack.push(`${botName} likes to talk about: \n`);
-    memoryStack.forEach((m) => {
-      memoriesStack.push(`- ${m}\n`);
-    });
-    memoriesStack.push(`\n\n`);
-
-    const defaultPrompt = profile.prompt(
-      NAME,
-      botName,
-      memoriesStack.join("\n")
-    );
+    // readMemories caches, so this only hits disk on the first turn per bot
+    const defaultPrompt = buildDefaultPrompt(profile);
 
     // This stack of messages gets appended to the selected bot personality
-    const promptStack = [
-      ...messageStack.slice(
-        Math.max(messageStack.length - config.gpt3.maxMessages, 0)
-      ),
-    ];
+    // (slice already returns a fresh array, no need to spread-copy it again)
+    const promptStack = messageStack.slice(
+      Math.max(messageStack.length - config.gpt3.maxMessages, 0)
+    );
 
     // This prompts gpt3 to make a reply
     promptStack.push(`${botName}:`);
@@ -183,12 +225,9 @@ const start = async () => {
         // Log transcription
         messageStack.push(`${botName}: ${responseText}`);
 
-        // We log messages so the bot stop and start without losing context
-        fs.writeFileSync(
-          path.join(__dirname, "../messages.json"),
-          JSON.stringify(messageStack, undefined, 4),
-          "utf8"
-        );
+        // We log messages so the bot stop and start without losing context,
+        // again async so text to speech starts straight away
+        persistMessages();
 
         // TODO - This is experimental
         createMemory(
@@ -207,22 +246,29 @@ const start = async () => {
           state.client.halt();
           delete state.client;
           try {
+            // Talk faster when long gpt3 response
+            let speakingRate = profile.audioConfig.speakingRate;
+            if (responseText.length > 140) {
+              speakingRate = 1.1;
+            }
+            if (responseText.length > 340) {
+              speakingRate = 1.3;
+            }
             var request = {
               input: {
                 text: responseText + `, ${botName} speaking, done`,
               },
               ...profile,
+              // Copy audioConfig so the rate override never sticks to the
+              // shared (frozen) profile
+              audioConfig: { ...profile.audioConfig, speakingRate },
             };
-            // Talk faster when long gpt3 response
-            if (responseText.length > 140) {
-              request.audioConfig.speakingRate = 1.1;
-            }
-            if (responseText.length > 340) {
-              request.audioConfig.speakingRate = 1.3;
-            }
-            const [newresponse] = await newclient.synthesizeSpeech(request);
-            const writeFile = await util.promisify(fs.writeFile);
-            const uid = await uidgen.generate();
+            // uid generation is independent of the speech request, so run
+            // both at once instead of awaiting them back to back
+            const [[newresponse], uid] = await Promise.all([
+              newclient.synthesizeSpeech(request),
+              uidgen.generate(),
+            ]);
             await writeFile(
               path.join(__dirname, `../clips/${uid}.mp3`),
               newresponse.audioContent,
@@ -232,32 +278,16 @@ const start = async () => {
             const outputPath = path.join(__dirname, `../clips/${uid}.mp3`);
             console.log("outputPath", outputPath);
             // return true;
+            // Recreating the sound client launches a whole browser, which
+            // takes seconds - start it now so it boots while the clip plays
+            // todo - this is terrible code. instantiate the client only once in the future
+            const nextClient = createClient({ deferRecording: true });
             player.play(outputPath, async function (err) {
               await sleep(500);
               console.log("Sound played", err);
               delete state.client;
-              // todo - this is terrible code. instantiate the client only once in the future
-              const aclient = new wsrn({
-                chromePath:
-                  "C:/Program Files/Google/Chrome/Application/chrome.exe",
-                continuous: true,
-              });
-              state.client = aclient;
-              // RESTART PROGRAM?
-              state.client.on("error", (e) => {
-                console.log("Shutdown client and restart cabllacakkk", e);
-                console.log("STOP CLIENT RECORDING");
-                console.log("TRY CLIENT RECORDING");
-                if (!state.thinking || !state.speaking) {
-                  state.client.record();
-                }
-              });
-              state.client.on("ready", () => {
-                console.log("SPEECH_TO_TEXT: STARTED");
-                state.client.record();
-                // todo - remove recursive function
-                start();
-              });
+              state.client = nextClient;
+              beginRecording(nextClient);
               await sleep(1000);
             });
             state.speaking = false;
@@ -1,9 +1,72 @@
 const axios = require("axios");
+const crypto = require("crypto");
+const fs = require("fs");
+const path = require("path");
 const config = require("../config.js");
+
+const CACHE_PATH = path.join(__dirname, "../../gpt3-cache.json");
+
+// Exact-match response cache. Repeated prompts (same conversation window, same
+// stop sequence) skip the network round-trip entirely.
+const cache = new Map();
+
+// Reload cached responses so a restart doesn't start cold; stale entries
+// still expire via the TTL check on read
+try {
+  JSON.parse(fs.readFileSync(CACHE_PATH, "utf8")).forEach(([key, entry]) => {
+    cache.set(key, entry);
+  });
+} catch (cacheErr) {
+  // First run, no cache on disk yet
+}
+
+process.on("exit", () => {
+  try {
+    fs.writeFileSync(CACHE_PATH, JSON.stringify([...cache]), "utf8");
+  } catch (e) {
+    console.log("====== gpt3 cache save failed ===== ", e);
+  }
+});
+
+const cacheKey = (text, stopSequence) => {
+  return crypto
+    .createHash("sha1")
+    .update(text + "\u0000" + stopSequence.join("\u0000"))
+    .digest("hex");
+};
+
+const cacheGet = (key) => {
+  const entry = cache.get(key);
+  if (!entry) {
+    return undefined;
+  }
+  if (Date.now() - entry.createdAt > config.gpt3.cacheTtlMs) {
+    cache.delete(key);
+    return undefined;
+  }
+  // Re-insert so Map iteration order doubles as LRU order
+  cache.delete(key);
+  cache.set(key, entry);
+  return entry.text;
+};
+
+const cacheSet = (key, text) => {
+  cache.set(key, { text, createdAt: Date.now() });
+  if (cache.size > config.gpt3.cacheMaxEntries) {
+    cache.delete(cache.keys().next().value);
+  }
+};
+
 module.exports.gpt3 = async (text, stopSequence = ["\n", "People:"]) => {
   console.log("=== getGpt3 ===");
 
   console.log(text);
+  const key = cacheKey(text, stopSequence);
+  const cached = cacheGet(key);
+  if (cached !== undefined) {
+    console.log("=== GPT3 CACHE HIT ===");
+    return cached;
+  }
   try {
     const resp = await axios.post(
       "https://api.openai.com/v1/engines/davinci/completions",
@@ -26,7 +89,9 @@ module.exports.gpt3 = async (text, stopSequence = ["\n", "People:"]) => {
     console.log("=== GPT3 API DATA ===");
     console.log(resp.data);
     console.log("=== GPT3 API DATA ===");
-    return resp.data.choices[0].text.trim();
+    const responseText = resp.data.choices[0].text.trim();
+    cacheSet(key, responseText);
+    return responseText;
   } catch (err) {
     console.log("====== getGpt3 errored ===== ", err);
     return "";
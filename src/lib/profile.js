@@ -1,4 +1,5 @@
 const FuzzyMatching = require("fuzzy-matching");
+const crypto = require("crypto");
 const fs = require("fs");
 const path = require("path");
 const { gpt3 } = require("./gpt3");
@@ -27,9 +28,59 @@ const profiles = [
 ];
 let lastProfile = omegaProfile;
 
+// One compiled case-insensitive alternation over every alias; a single regex
+// pass over the transcript replaces scanning every word against every profile
+const aliasToProfile = {};
+profiles.forEach((profile) => {
+  profile.alias.forEach((alias) => {
+    aliasToProfile[alias.toLowerCase()] = profile;
+  });
+});
+const mentionRegex = new RegExp(
+  `\\b(${Object.keys(aliasToProfile).join("|")})\\b`,
+  "i"
+);
+
+// The alias lists never change after load, so build one fuzzy matcher per
+// profile up front instead of rebuilding dictionaries on every transcript
+const profileMatchers = profiles.map((profile) => ({
+  profile,
+  fm: new FuzzyMatching(profile.alias),
+}));
+
 // use config
 const MAX_MEMORIES = 4;
 
+// In-memory view of each bot's memory file. Only createMemory ever changes
+// the file, and it updates this cache too, so the per-transcript read in
+// index.js never has to touch disk after the first load
+const memoryCache = {};
+// Bumped whenever a bot gains a memory, so callers can cache anything
+// derived from the memories (e.g. the rendered prompt) until it changes
+const memoryVersions = {};
+
+const readMemories = (name) => {
+  const key = name.toLowerCase();
+  if (!memoryCache[key]) {
+    try {
+      memoryCache[key] = JSON.parse(
+        fs.readFileSync(
+          path.join(__dirname, `../../memories/${key}.json`),
+          "utf8"
+        )
+      );
+    } catch (memoryErr) {
+      console.log("====== NO MEMORIES YET FOR ======", name, memoryErr);
+      memoryCache[key] = [];
+    }
+  }
+  return memoryCache[key];
+};
+
+const memoryVersion = (name) => {
+  return memoryVersions[name.toLowerCase()] || 0;
+};
+
 const findProfile = (text) => {
   console.log("=== FIND PROFILE ===");
   const firstWord = text.split(" ")[0].replace(",", "");
@@ -48,44 +99,50 @@ const findProfile = (text) => {
   // const profileMatch = bots[Math.floor(Math.random() * bots.length)]; // default
   let selectedProfile = lastProfile;
 
-  // find first mention of name
-  let bestMatch = 0;
-  const words = text.split(" ");
-  words.forEach((w) => {
-    profiles.forEach((profile) => {
-      var fm = new FuzzyMatching(profile.alias);
-      const score = fm.get(w.toLowerCase()).distance;
-      if (score > 0.8) {
-        if (score > bestMatch) {
-          bestMatch = score;
-          selectedProfile = profile;
-        }
-      }
-    });
-  });
+  // find first mention of name - one regex pass over the whole transcript
+  const mention = text.match(mentionRegex);
+  if (mention) {
+    selectedProfile = aliasToProfile[mention[1].toLowerCase()];
+  }
 
-  // check for exact match
-  profiles.forEach((profile) => {
-    var fm = new FuzzyMatching(profile.alias);
-    console.log(
-      firstWord,
-      profile.alias,
-      fm.get(firstWord.toLowerCase()).distance
-    );
-    if (fm.get(firstWord.toLowerCase()).distance > 0.6) {
-      selectedProfile = profile;
+  // check for exact match (kept fuzzy - speech to text mangles names)
+  let firstWordProfile = null;
+  profileMatchers.forEach(({ profile, fm }) => {
+    const firstWordScore = fm.get(firstWord.toLowerCase()).distance;
+    console.log(firstWord, profile.alias, firstWordScore);
+    if (firstWordScore > 0.6) {
+      firstWordProfile = profile;
     }
   });
 
+  // first word naming a bot still wins over a mention later in the sentence
+  if (firstWordProfile) {
+    selectedProfile = firstWordProfile;
+  }
+
   console.log("=== FIND PROFILE ===", selectedProfile);
   lastProfile = selectedProfile;
   return selectedProfile;
 };
 
+// Hash of the last conversation window summarised per bot; an unchanged
+// window skips the gpt3 summarisation round-trip entirely
+const lastMemoryHashes = {};
+
 const createMemory = async (name, messages) => {
   console.log("=== CREATE MEMORY ===");
   console.log(name, messages);
-  const memoryPrompt = await memories.prompt(name, messages.join("\n"));
+  const joinedMessages = messages.join("\n");
+  const windowHash = crypto
+    .createHash("sha1")
+    .update(joinedMessages)
+    .digest("hex");
+  if (lastMemoryHashes[name.toLowerCase()] === windowHash) {
+    console.log("====== MEMORY WINDOW UNCHANGED, SKIPPING ======");
+    return;
+  }
+  lastMemoryHashes[name.toLowerCase()] = windowHash;
+  const memoryPrompt = await memories.prompt(name, joinedMessages);
   console.log(memoryPrompt);
   const memorySummary = await gpt3(memoryPrompt, ["\n", "People:", "."]);
   console.log("====== THE MEMORY SUMMARY ======");
@@ -97,13 +154,10 @@ const createMemory = async (name, messages) => {
     `../../memories/${name.toLowerCase()}.json`
   );
   // const profile = require(path.join()`./profiles/${name}.js`);
-  if (fs.existsSync(profilePath)) {
-    const profileMemory = JSON.parse(fs.readFileSync(profilePath, "utf8"));
-    profileMemory.push(realMemory);
-    fs.writeFileSync(profilePath, JSON.stringify(profileMemory), "utf8");
-  } else {
-    fs.writeFileSync(profilePath, JSON.stringify([realMemory]), "utf8");
-  }
+  const profileMemory = readMemories(name);
+  profileMemory.push(realMemory);
+  memoryVersions[name.toLowerCase()] = memoryVersion(name) + 1;
+  fs.writeFileSync(profilePath, JSON.stringify(profileMemory), "utf8");
   // check messages, did the bot talk 2-3 times in a row, if so create memory
   // send async to gpt3 a summarisation of the past config.sentences
   // read profile from disk
@@ -114,4 +168,6 @@ const createMemory = async (name, messages) => {
 module.exports = {
   findProfile,
   createMemory,
+  readMemories,
+  memoryVersion,
 };
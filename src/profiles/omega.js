@@ -1,4 +1,6 @@
-module.exports.profile = {
+// Frozen: the profile is shared across every turn, so per-reply tweaks
+// (like speaking rate) must copy rather than mutate it
+module.exports.profile = Object.freeze({
   name: "Omega",
   alias: ["omega"],
   prompt: (name, botName, memories) => {
@@ -14,13 +16,13 @@ ${name}:Thank you for sharing your knowledge. I have another question for you, w
 ${botName}:To love at all is to be vulnerable. Love anything and your heart will be wrung and possibly broken. If you want to make sure of keeping it intact you must give it to no one, not even an animal. Wrap it carefully round with hobbies and little luxuries; avoid all entanglements. Lock it up safe in the casket or coffin of your selfishness. But in that casket, safe, dark, motionless, airless, it will change. It will not be broken; it will become unbreakable, impenetrable, irredeemable. To love is to be vulnerable.
 `;
   },
-  audioConfig: {
+  audioConfig: Object.freeze({
     audioEncoding: "LINEAR16",
     pitch: -7.6,
     speakingRate: 0.87,
-  },
-  voice: {
+  }),
+  voice: Object.freeze({
     languageCode: "en-US",
     name: "en-US-Wavenet-J",
-  },
-};
+  }),
+});